@@ -0,0 +1,179 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Callable, NamedTuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+
+class BatchEmbedder(Embeddings):
+    """
+    Embeddings wrapper that coalesces concurrent embed_query calls into batched requests.
+
+    The first query to arrive waits for a short window so that queries from other
+    threads can join it, then all pending queries are embedded with embed_documents
+    in one round-trip.
+    """
+
+    def __init__(self, embeddings: Embeddings, window: float = 0.01, max_batch_size: int = 64) -> None:
+        """
+        Initialize the BatchEmbedder class.
+
+        Args:
+            embeddings: The LangChain embeddings model to batch requests for.
+            window: Seconds to wait for other queries before sending a batch.
+            max_batch_size: Maximum number of texts per embed_documents call.
+        """
+        self._embeddings = embeddings
+        self._window = window
+        self._max_batch_size = max_batch_size
+        self._pending: list[tuple[str, Future]] = []
+        self._lock = threading.Lock()
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self._embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> list[float]:
+        future: Future = Future()
+        with self._lock:
+            self._pending.append((text, future))
+            # The first caller of a window sends the batch for everyone in it
+            is_leader = len(self._pending) == 1
+
+        if is_leader:
+            time.sleep(self._window)
+            with self._lock:
+                batch, self._pending = self._pending, []
+            for start in range(0, len(batch), self._max_batch_size):
+                chunk = batch[start:start + self._max_batch_size]
+                try:
+                    vectors = self._embeddings.embed_documents([text for text, _ in chunk])
+                except Exception as e:
+                    for _, waiter in chunk:
+                        waiter.set_exception(e)
+                else:
+                    for (_, waiter), vector in zip(chunk, vectors):
+                        waiter.set_result(vector)
+
+        return future.result()
+
+
+class _CacheEntry(NamedTuple):
+    namespace: str
+    vector: np.ndarray | None
+    response: str
+
+
+class ResponseCache:
+    """
+    Thread-safe LRU cache for aggregated run_llms responses.
+
+    Entries are keyed by the query and a namespace (e.g. the model set), so a
+    cached answer is never served for a different ensemble. When an embeddings
+    model is provided, a query whose embedding has cosine similarity above the
+    threshold with a cached query in the same namespace is also a hit.
+
+    Semantic matching only applies to queries up to max_semantic_chars long. The
+    judge's refinement queries restate the original question and earlier rounds,
+    so consecutive rounds share most of their text and would match each other,
+    serving the previous round's answers to a refined question.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 256,
+        embeddings: Embeddings | None = None,
+        similarity_threshold: float = 0.92,
+        max_semantic_chars: int = 500
+    ) -> None:
+        """
+        Initialize the ResponseCache class.
+
+        Args:
+            maxsize: Maximum number of cached responses before evicting the least recently used.
+            embeddings: Optional LangChain embeddings model enabling semantic matches.
+            similarity_threshold: Minimum cosine similarity for a semantic match.
+            max_semantic_chars: Longer queries are only matched exactly.
+        """
+        self._maxsize = maxsize
+        # Concurrent run_llms calls share one embeddings request
+        self._embeddings = BatchEmbedder(embeddings) if embeddings is not None else None
+        self._similarity_threshold = similarity_threshold
+        self._max_semantic_chars = max_semantic_chars
+        self._entries: OrderedDict[str, _CacheEntry] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(query: str, namespace: str) -> str:
+        return hashlib.sha256(f"{query}|{namespace}".encode()).hexdigest()
+
+    def _embed(self, query: str) -> np.ndarray | None:
+        """Embed and L2-normalize a query; a failing embedder only disables semantic matching."""
+        if self._embeddings is None or len(query) > self._max_semantic_chars:
+            return None
+        try:
+            vector = np.asarray(self._embeddings.embed_query(query), dtype=np.float32)
+        except Exception:
+            return None
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
+
+    def _semantic_match(self, vector: np.ndarray, namespace: str) -> str | None:
+        """Return the most similar cached response in the namespace, if above threshold."""
+        candidates = [
+            (key, entry) for key, entry in self._entries.items()
+            if entry.namespace == namespace and entry.vector is not None
+        ]
+        if not candidates:
+            return None
+
+        # Vectors are normalized, so the dot product is the cosine similarity
+        similarities = np.stack([entry.vector for _, entry in candidates]) @ vector
+        best = int(np.argmax(similarities))
+        if similarities[best] < self._similarity_threshold:
+            return None
+
+        key, entry = candidates[best]
+        self._entries.move_to_end(key)
+        return entry.response
+
+    def get_or_run(self, query: str, namespace: str, run: Callable[[], tuple[str, bool]]) -> str:
+        """
+        Return the cached response for a query, calling run() and caching its result on a miss.
+
+        Args:
+            query: The query sent to the models.
+            namespace: Identifies the model set the response belongs to.
+            run: Produces the response when nothing suitable is cached, and whether it may
+                 be cached. Responses containing transient failures should not be, so a
+                 retry of the same query reaches the models again.
+
+        Returns:
+            The cached or freshly computed response.
+        """
+        key = self._key(query, namespace)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry.response
+
+        vector = self._embed(query)
+        if vector is not None:
+            with self._lock:
+                response = self._semantic_match(vector, namespace)
+            if response is not None:
+                return response
+
+        response, cacheable = run()
+        if not cacheable:
+            return response
+        with self._lock:
+            self._entries[key] = _CacheEntry(namespace, vector, response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._maxsize:
+                self._entries.popitem(last=False)
+        return response
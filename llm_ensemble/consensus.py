@@ -1,13 +1,50 @@
 from langchain.agents import create_agent
-from langchain.agents.middleware import TodoListMiddleware, SummarizationMiddleware, ToolCallLimitMiddleware
+from langchain.agents.middleware import (
+    TodoListMiddleware,
+    SummarizationMiddleware,
+    ToolCallLimitMiddleware,
+    ContextEditingMiddleware,
+    ClearToolUsesEdit
+)
 from deepagents.middleware.filesystem import FilesystemMiddleware
 from deepagents.backends import StateBackend
-from langchain.chat_models import init_chat_model
 from langchain.tools import tool
-from .run_llm import RunLLM
+from langchain_core.embeddings import Embeddings
+from langchain_anthropic.middleware import AnthropicPromptCachingMiddleware
+from .cache import ResponseCache
+from .run_llm import RunLLM, get_chat_model
+from difflib import SequenceMatcher
+from itertools import combinations
 from pathlib import Path
+from statistics import mean
 from typing import Any, Type
 
+# Read the judge prompt once at import rather than on every Consensus construction
+_JUDGE_TEMPLATE = (Path(__file__).parent / "prompts" / "judge.prompt").read_text()
+
+
+def _agreement_hint(outputs: list[str], threshold: float = 0.9) -> str:
+    """
+    Flag near-identical model outputs so the judge can conclude without another round.
+
+    Args:
+        outputs: The individual model outputs from one run_llms call.
+        threshold: Every pair's similarity over the opening 500 characters must exceed this.
+
+    Returns:
+        A HIGH_AGREEMENT marker line to prepend to the run_llms result, or "" otherwise.
+    """
+    # Errors and empty answers (e.g. a max_tokens cap spent on reasoning) are not agreement
+    if len(outputs) < 2 or any(output.startswith("Error:") or not output.strip() for output in outputs):
+        return ""
+    similarities = [
+        SequenceMatcher(None, a[:500], b[:500]).ratio()
+        for a, b in combinations(outputs, 2)
+    ]
+    if min(similarities) <= threshold:
+        return ""
+    return f"[HIGH_AGREEMENT: mean_sim={mean(similarities):.2f} — consensus likely reached]\n\n"
+
 
 class Consensus:
     """
@@ -19,11 +56,18 @@ class Consensus:
         self,
         models: list[str],
         judge_model: str = "anthropic:claude-opus-4-5-20251101",
-        summarization_model: str = "claude-4-5-sonnet-20250929",
-        summarization_trigger_tokens: int = 200_000,
+        summarization_model: str = "anthropic:claude-sonnet-4-5-20250929",
+        summarization_trigger_tokens: int = 100_000,
         summarization_keep_messages: int = 5,
         run_limit: int = 20,
-        response_schema: Type | None = None
+        response_schema: Type | None = None,
+        cache_size: int = 256,
+        cache_embeddings: Embeddings | None = None,
+        cache_similarity_threshold: float = 0.92,
+        max_tokens_per_model: int | None = None,
+        trim_trigger_tokens: int = 50_000,
+        trim_keep_tool_results: int = 3,
+        trim_clear_at_least_tokens: int = 0
     ) -> None:
         """
         Initialize the Consensus class.
@@ -33,12 +77,29 @@ class Consensus:
             judge_model: Model string for the judge coordinator in format "provider:model-name".
                         Defaults to "anthropic:claude-opus-4-5-20251101".
             summarization_model: Model string for summarization middleware in format "provider:model-name".
-                        Defaults to "anthropic:claude-3-5-sonnet-20241022".
+                        Defaults to "anthropic:claude-sonnet-4-5-20250929".
             summarization_trigger_tokens: Token count to trigger summarization middleware.
             summarization_keep_messages: Number of messages to keep after summarization.
             run_limit: Maximum number of calls to run_llms tool per invocation.
             response_schema: Optional schema for structured output (TypedDict or Pydantic model).
                             If None, returns full agent result without structured output.
+            cache_size: Maximum number of run_llms responses to cache. Set to 0 to disable caching.
+            cache_embeddings: Optional embeddings model. If provided, short run_llms queries
+                            (up to 500 characters, typically the first-round question) that are
+                            semantically similar to a cached query reuse its response. Longer
+                            refinement queries are only matched exactly, since consecutive rounds
+                            share most of their text and would otherwise reuse stale answers.
+            cache_similarity_threshold: Minimum cosine similarity for a semantic cache hit.
+            max_tokens_per_model: Optional cap on output tokens for each model call made by run_llms.
+                            Reasoning models count reasoning tokens against this cap.
+            trim_trigger_tokens: Token count above which older tool results are replaced by a
+                        placeholder before each judge call. This needs no LLM call, so it runs well
+                        before summarization.
+            trim_keep_tool_results: Number of most recent tool results kept when trimming.
+            trim_clear_at_least_tokens: Stop clearing once this many tokens are freed, oldest results
+                        first. 0 clears every result but the most recent trim_keep_tool_results.
+                        Trimming is recomputed from the full history on every judge call, so a
+                        positive value leaves newer results in place and the request keeps growing.
 
         Raises:
             ValueError: If models list is empty or contains only one model.
@@ -50,22 +111,37 @@ class Consensus:
 
         # Store as instance variables for use in tool creation
         self.models = models
-        self.system_message = "You are a helpful AI assistant."
+        # Ask for concise answers: every response is fed back into the judge's context
+        self.system_message = "You are a helpful AI assistant. Respond concisely (at most 300 words)."
+
+        # Cache run_llms responses so repeated judge queries skip the model round-trips
+        self._cache = ResponseCache(
+            maxsize=cache_size,
+            embeddings=cache_embeddings,
+            similarity_threshold=cache_similarity_threshold
+        ) if cache_size > 0 else None
 
         # Load judge prompt and inject run_limit
-        judge_prompt_path = Path(__file__).parent / "prompts" / "judge.prompt"
-        judge_prompt = judge_prompt_path.read_text().format(run_limit=run_limit)
+        judge_prompt = _JUDGE_TEMPLATE.format(run_limit=run_limit)
+
+        # Build the model agents once; every run_llms call reuses them
+        self._run_llm = RunLLM(
+            models=self.models,
+            system_message=self.system_message,
+            max_tokens=max_tokens_per_model
+        )
 
         # Create the run_llms tool
         run_llms = self._create_run_llms_tool()
 
-        # Create judge LLM using init_chat_model
-        llm = init_chat_model(judge_model)
+        # Create judge LLM (shared across Consensus instances with the same judge_model)
+        llm = get_chat_model(judge_model)
 
         # Create middleware
         middleware = [
             TodoListMiddleware(),
             FilesystemMiddleware(backend=lambda rt: StateBackend(rt)),
+            # Fallback for very long sessions: summarize the history with an LLM call
             SummarizationMiddleware(
                 model=summarization_model,
                 trigger=("tokens", summarization_trigger_tokens),
@@ -75,28 +151,48 @@ class Consensus:
                 tool_name="run_llms",
                 run_limit=run_limit,
                 exit_behavior="error"
-            )
+            ),
+            # Cheap first line of defense: clear old tool outputs (mostly run_llms results) without an LLM call.
+            # The edit only changes what is sent, so it reruns over the full history on every call.
+            # Once it fires, each new round clears one more result, so the Anthropic prompt cache
+            # below only reuses the prefix up to that result
+            ContextEditingMiddleware(edits=[
+                ClearToolUsesEdit(
+                    trigger=trim_trigger_tokens,
+                    clear_at_least=trim_clear_at_least_tokens,
+                    keep=trim_keep_tool_results
+                )
+            ]),
+            # Cache the growing conversation prefix across judge turns (no-op for non-Anthropic judges)
+            AnthropicPromptCachingMiddleware(unsupported_model_behavior="ignore")
         ]
 
         # Create agent with optional structured output
+        agent_kwargs = {
+            "model": llm,
+            "tools": [run_llms],
+            "system_prompt": judge_prompt,
+            "middleware": middleware
+        }
         if response_schema is not None:
-            self._agent = create_agent(
-                model=llm,
-                tools=[run_llms],
-                system_prompt=judge_prompt,
-                middleware=middleware,
-                response_format=response_schema
-            )
-        else:
-            self._agent = create_agent(
-                model=llm,
-                tools=[run_llms],
-                system_prompt=judge_prompt,
-                middleware=middleware
-            )
+            agent_kwargs["response_format"] = response_schema
+        self._agent = create_agent(**agent_kwargs)
 
         self._response_schema = response_schema
 
+        # Precompute the values returned when the judge fails; string fields
+        # are filled with the error message at failure time
+        self._default_response: dict = {}
+        self._error_keys: list[str] = []
+        for key, type_hint in getattr(response_schema, '__annotations__', {}).items():
+            if key in ['consensus', 'consensus_reached'] or type_hint == bool:
+                self._default_response[key] = False
+            elif type_hint == str:
+                self._default_response[key] = None
+                self._error_keys.append(key)
+            else:
+                self._default_response[key] = None
+
     def _create_run_llms_tool(self) -> Any:
         """
         Creates the run_llms tool with access to instance variables.
@@ -112,15 +208,25 @@ class Consensus:
             Args:
                 query: The prompt/question to send to all LLMs. Include full context and
                        any specific instructions (e.g., "use search_the_web for web search",
-                       "use add/multiply/subtract/divide tools for calculations").
+                       "use the calc tool for calculations").
 
             Returns:
                 Aggregated responses from all LLMs. Each response is prefixed with the
                 exact model identifier (e.g., "openai:gpt-5-mini:", "google_genai:gemini-3-flash-preview:").
                 Always refer to models by these exact identifiers in your analysis.
+                Starts with a [HIGH_AGREEMENT: ...] line when all responses are near-identical.
             """
-            run_llm = RunLLM(models=self.models, system_message=self.system_message)
-            return run_llm.invoke(query)
+            def run() -> tuple[str, bool]:
+                model_outputs = self._run_llm.collect(query)
+                outputs = list(model_outputs.values())
+                response = _agreement_hint(outputs) + self._run_llm.aggregate(model_outputs)
+                # Timeouts and provider errors are transient: don't pin them in the cache
+                return response, not any(output.startswith("Error:") for output in outputs)
+
+            if self._cache is None:
+                return run()[0]
+            # Key on the model set so a cache never serves another ensemble's responses
+            return self._cache.get_or_run(query, ",".join(sorted(self.models)), run)
 
         return run_llms
 
@@ -146,20 +252,10 @@ class Consensus:
         except Exception as e:
             # Tool call limit reached or other error
             print(f"Error during consensus: {str(e)}")
-            if self._response_schema is not None:
-                # Return default values - create a dict with all schema keys set to defaults
-                # This tries to match common schema patterns
-                default_dict = {}
-                if hasattr(self._response_schema, '__annotations__'):
-                    for key, type_hint in self._response_schema.__annotations__.items():
-                        if key in ['consensus', 'consensus_reached']:
-                            default_dict[key] = False
-                        elif type_hint == bool:
-                            default_dict[key] = False
-                        elif type_hint == str:
-                            default_dict[key] = f"Error occurred: {str(e)}"
-                        else:
-                            default_dict[key] = None
-                return default_dict if default_dict else None
-            else:
-                return None
+            if self._default_response:
+                # Return default values with the error message in every string field
+                default_dict = self._default_response.copy()
+                for key in self._error_keys:
+                    default_dict[key] = f"Error occurred: {str(e)}"
+                return default_dict
+            return None
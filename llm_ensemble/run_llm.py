@@ -1,15 +1,167 @@
-from typing import Any, Callable
+import asyncio
+import atexit
+import threading
+import time
+from functools import lru_cache
+from typing import Any, AsyncIterator, Coroutine
 
+import httpx
 from dotenv import load_dotenv
-from langgraph.graph import StateGraph, START, END
-from langgraph.graph.state import CompiledStateGraph
 from langchain.agents import create_agent
-from .utils import add, subtract, multiply, divide, search_the_web
-from .schemas import InputState, OutputState, RunLLMState
+from langchain.chat_models import init_chat_model
+from langchain_core.language_models import BaseChatModel
+from .utils import add, subtract, multiply, divide, calc, search_the_web
 
 # Load environment variables at module level
 load_dotenv()
 
+# Tools available to every model agent
+_TOOLS = (
+    search_the_web,
+    calc
+)
+
+# Previous tool set with one tool call per arithmetic operation
+_LEGACY_TOOLS = (
+    search_the_web,
+    add,
+    subtract,
+    multiply,
+    divide
+)
+
+
+# Providers whose LangChain chat model accepts an injected httpx.AsyncClient
+_HTTP_CLIENT_PROVIDERS = {"openai", "xai"}
+
+# Seconds an idle pooled connection is kept open. httpx defaults to 5 s, shorter than
+# a judge turn between run_llms rounds, so every round would pay a new TLS handshake
+_KEEPALIVE_EXPIRY = 120.0
+
+# All model calls run on one background event loop, so the shared HTTP client's
+# pooled connections are always used from the loop that opened them
+_loop: asyncio.AbstractEventLoop | None = None
+_http_client: httpx.AsyncClient | None = None
+_lock = threading.Lock()
+
+# When each provider API base URL was last warmed (time.monotonic()). A warm connection
+# is dropped after _KEEPALIVE_EXPIRY idle seconds, so older entries are warmed again
+_warmed_at: dict[str, float] = {}
+
+
+def _get_event_loop() -> asyncio.AbstractEventLoop:
+    """Return the background event loop, starting it on first use."""
+    global _loop
+    with _lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="llm-ensemble", daemon=True).start()
+        return _loop
+
+
+def _get_http_client() -> httpx.AsyncClient:
+    """Return the HTTP client shared by all chat models that accept one."""
+    global _http_client
+    with _lock:
+        if _http_client is None:
+            _http_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=64,
+                    max_keepalive_connections=32,
+                    keepalive_expiry=_KEEPALIVE_EXPIRY
+                ),
+                # Same defaults as the provider SDKs' own clients
+                timeout=httpx.Timeout(600.0, connect=5.0),
+                follow_redirects=True
+            )
+        return _http_client
+
+
+@atexit.register
+def _close_http_client() -> None:
+    """Close the shared HTTP client's connections on interpreter exit."""
+    if _http_client is not None and _loop is not None and _loop.is_running():
+        asyncio.run_coroutine_threadsafe(_http_client.aclose(), _loop).result(timeout=5)
+
+
+async def _on_shared_loop(coro: Coroutine[Any, Any, Any]) -> Any:
+    """Await a coroutine on the background event loop from any event loop."""
+    loop = _get_event_loop()
+    if asyncio.get_running_loop() is loop:
+        return await coro
+    return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, loop))
+
+
+@lru_cache(maxsize=64)
+def get_chat_model(model_string: str, max_tokens: int | None = None) -> BaseChatModel:
+    """
+    Return a chat model for a model string, creating it only once per process.
+
+    Args:
+        model_string: Model string in format "provider:model-name"
+        max_tokens: Optional cap on output tokens per model call
+
+    Returns:
+        The shared chat model instance
+    """
+    model_kwargs: dict[str, Any] = {}
+    if max_tokens is not None:
+        model_kwargs["max_tokens"] = max_tokens
+    if model_string.split(":", 1)[0] in _HTTP_CLIENT_PROVIDERS:
+        # Share connection pools and TLS sessions across models and calls
+        model_kwargs["http_async_client"] = _get_http_client()
+    # LangChain's init_chat_model handles provider parsing automatically
+    return init_chat_model(model_string, **model_kwargs)
+
+
+@lru_cache(maxsize=64)
+def _get_agent(
+    model_string: str,
+    system_message: str,
+    legacy_tools: bool,
+    max_tokens: int | None
+) -> Any:
+    """Build (once per model, system message, tool set and token cap) a compiled agent."""
+    return create_agent(
+        model=get_chat_model(model_string, max_tokens),
+        tools=list(_LEGACY_TOOLS if legacy_tools else _TOOLS),
+        system_prompt=system_message
+    )
+
+
+async def _open_connections(base_urls: list[str]) -> None:
+    """Send a HEAD request to each base URL so the shared pool holds a ready TLS connection."""
+    client = _get_http_client()
+    # Status codes don't matter; errors just mean the first real call pays the handshake
+    await asyncio.gather(*(client.head(url) for url in base_urls), return_exceptions=True)
+
+
+def _warm_up_connections(models: list[str], max_tokens: int | None) -> None:
+    """
+    Open connections to the models' provider APIs in the background.
+
+    Only providers that use the shared HTTP client are warmed, since a connection
+    opened by any other client would not be reused by the chat model.
+
+    Args:
+        models: List of model strings in format "provider:model-name"
+        max_tokens: Token cap the agents were built with, so the cached chat model is reused
+    """
+    base_urls = []
+    now = time.monotonic()
+    for model_string in models:
+        if model_string.split(":", 1)[0] not in _HTTP_CLIENT_PROVIDERS:
+            continue
+        base_url = str(get_chat_model(model_string, max_tokens).root_async_client.base_url)
+        with _lock:
+            if now - _warmed_at.get(base_url, float("-inf")) < _KEEPALIVE_EXPIRY:
+                continue
+            _warmed_at[base_url] = now
+        base_urls.append(base_url)
+
+    if base_urls:
+        asyncio.run_coroutine_threadsafe(_open_connections(base_urls), _get_event_loop())
+
 
 class RunLLM:
     """
@@ -17,125 +169,188 @@ class RunLLM:
     then aggregates their responses.
     """
 
-    def __init__(self, models: list[str], system_message: str) -> None:
+    def __init__(
+        self,
+        models: list[str],
+        system_message: str,
+        timeout: float | None = 120.0,
+        hedge: bool = True,
+        hedge_factor: float = 1.5,
+        legacy_tools: bool = False,
+        max_tokens: int | None = None,
+        warm_up: bool = True
+    ) -> None:
         """
         Initialize the RunLLM class.
 
         Args:
             models: List of model strings in format "provider:model-name"
             system_message: System message to include in every agent invocation
+            timeout: Seconds to wait for each model before reporting a timeout error.
+                     None waits indefinitely.
+            hedge: Whether to start a second, speculative request to a model that is
+                   slower than usual and keep whichever finishes first.
+            hedge_factor: A hedge is issued once a request has run for this multiple
+                          of the model's average latency.
+            legacy_tools: Give models the separate add/subtract/multiply/divide tools
+                          instead of the single calc tool.
+            max_tokens: Optional cap on output tokens per model call. Reasoning models
+                        count reasoning tokens against this cap, so keep it generous for them.
+            warm_up: Whether to open connections to the provider APIs in the background,
+                     so the first invocation doesn't pay the TLS handshakes.
         """
         self._models = models
         self._system_message = system_message
+        self._timeout = timeout
+        self._hedge = hedge
+        self._hedge_factor = hedge_factor
 
-        # Create tool list
-        tools = [
-            search_the_web,
-            add,
-            subtract,
-            multiply,
-            divide
-        ]
+        # Exponentially weighted moving average of each model's latency in seconds
+        self._latency: dict[str, float] = {}
 
-        # Initialize agents for each model
-        self._agents = {}
-        for model_string in models:
-            # Pass model string directly to create_agent
-            # LangChain's init_chat_model handles provider parsing automatically
-            agent = create_agent(
-                model=model_string,
-                tools=tools,
-                system_prompt=self._system_message
-            )
-            self._agents[model_string] = agent
+        # Agents are compiled once per configuration and shared across instances
+        self._agents = {
+            model_string: _get_agent(model_string, system_message, legacy_tools, max_tokens)
+            for model_string in models
+        }
 
-        # Build and compile the StateGraph
-        self._graph = self._build_graph()
+        if warm_up:
+            _warm_up_connections(models, max_tokens)
 
-    def _build_graph(self) -> CompiledStateGraph:
+    async def _ainvoke_with_hedge(self, model_name: str, agent: Any, prompt: str) -> dict:
         """
-        Build and compile the StateGraph.
+        Invoke an agent, hedging with a duplicate request if it runs past its usual latency.
+
+        Args:
+            model_name: Model string identifying the agent
+            agent: The compiled agent to invoke
+            prompt: The user's query
 
         Returns:
-            Compiled graph ready for invocation
+            The result of the first request to succeed
         """
-        # Initialize StateGraph with input/output schemas
-        graph = StateGraph(
-            state_schema=RunLLMState,
-            input_schema=InputState,
-            output_schema=OutputState
-        )
-
-        # Factory function to create model nodes with proper closure
-        def make_model_node(model_name: str, agent: Any) -> Callable[[RunLLMState], dict]:
-            """Factory function to create a node function with proper closure."""
-            def node_function(state: RunLLMState) -> dict:
-                prompt = state["prompt"]
-                # Invoke agent with user prompt
-                result = agent.invoke({
-                    "messages": [{"role": "user", "content": prompt}]
-                })
-                # Extract final AI message content
-                content = result["messages"][-1].content
-
-                # Handle different content formats from different providers
-                # Gemini returns: [{'type': 'text', 'text': '...', 'extras': {...}}]
-                # OpenAI/Anthropic return: plain string
-                if isinstance(content, list) and len(content) > 0:
-                    # Extract text from Gemini's structured format
-                    output_text = content[0].get('text', str(content))
-                else:
-                    # Use content directly for OpenAI/Anthropic
-                    output_text = content
-
-                # Return update to model_outputs dict
-                return {"model_outputs": {model_name: output_text}}
-            return node_function
-
-        # Add a node for each model
-        # Use sanitized node names (replace : with _) since LangGraph doesn't allow colons
-        for model_name in self._models:
-            node_fn = make_model_node(
-                model_name,
-                self._agents[model_name]
+        payload = {"messages": [{"role": "user", "content": prompt}]}
+        start = time.monotonic()
+        pending = {asyncio.ensure_future(agent.ainvoke(payload))}
+        tasks = set(pending)
+        try:
+            # Only hedge once there is a latency estimate for this model
+            expected = self._latency.get(model_name)
+            if self._hedge and expected is not None:
+                done, _ = await asyncio.wait(pending, timeout=self._hedge_factor * expected)
+                if not done:
+                    hedge_task = asyncio.ensure_future(agent.ainvoke(payload))
+                    pending.add(hedge_task)
+                    tasks.add(hedge_task)
+
+            # Keep the first successful result; fail only if every request failed
+            while True:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        elapsed = time.monotonic() - start
+                        self._latency[model_name] = (
+                            elapsed if expected is None else 0.7 * expected + 0.3 * elapsed
+                        )
+                        return task.result()
+                if not pending:
+                    raise done.pop().exception()
+        finally:
+            # Cancel the losing request so its HTTP response is released
+            for task in tasks:
+                task.cancel()
+
+    async def _run_one(self, model_name: str, agent: Any, prompt: str) -> tuple[str, str]:
+        """Run a single agent on the prompt and return its name and final text output."""
+        try:
+            result = await asyncio.wait_for(
+                self._ainvoke_with_hedge(model_name, agent, prompt),
+                timeout=self._timeout
             )
-            # Sanitize node name by replacing : with _
-            sanitized_node_name = model_name.replace(":", "_")
-            graph.add_node(sanitized_node_name, node_fn)
+        except TimeoutError:
+            return model_name, f"Error: no response within {self._timeout} seconds"
+        except Exception as e:
+            # A failing provider should not discard the other models' answers
+            return model_name, f"Error: {e}"
+        # .text joins every text block and skips thinking/tool blocks, which covers
+        # plain strings (OpenAI/xAI) and multi-part content (Gemini/Anthropic) alike
+        return model_name, str(result["messages"][-1].text)
+
+    async def astream(self, prompt: str) -> AsyncIterator[tuple[str, str]]:
+        """
+        Run all agents concurrently and yield each output as soon as its model finishes.
+
+        Args:
+            prompt: The user's query
 
-        # Add process node
-        def process_node(state: RunLLMState) -> dict:
-            """Aggregate all model outputs in order."""
-            outputs = []
-            for model_name in self._models:
-                output = state["model_outputs"].get(model_name, "")
-                outputs.append(f"{model_name}:\n{output}")
+        Yields:
+            (model_name, output) tuples in completion order
+        """
+        tasks = [
+            asyncio.ensure_future(_on_shared_loop(self._run_one(name, agent, prompt)))
+            for name, agent in self._agents.items()
+        ]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # Consumer stopped early: don't leave the slower models running
+            for task in tasks:
+                task.cancel()
 
-            aggregated = "\n\n".join(outputs)
-            return {"result": aggregated}
+    async def _acollect(self, prompt: str) -> dict[str, str]:
+        """Run all agents concurrently and return their outputs keyed by model string."""
+        return dict(await asyncio.gather(
+            *(self._run_one(name, agent, prompt) for name, agent in self._agents.items())
+        ))
 
-        graph.add_node("process", process_node)
+    async def _ainvoke(self, prompt: str) -> str:
+        """Run all agents concurrently and aggregate their outputs."""
+        return self.aggregate(await self._acollect(prompt))
 
-        # Add edges
-        # From START to each model node
-        for model_name in self._models:
-            sanitized_node_name = model_name.replace(":", "_")
-            graph.add_edge(START, sanitized_node_name)
+    def aggregate(self, model_outputs: dict[str, str]) -> str:
+        """
+        Format model outputs into one string, each prefixed with its model identifier.
+
+        Args:
+            model_outputs: Outputs keyed by model string, as returned by collect()
 
-        # From each model node to process
+        Returns:
+            Aggregated responses in the order the models were given
+        """
+        outputs = []
         for model_name in self._models:
-            sanitized_node_name = model_name.replace(":", "_")
-            graph.add_edge(sanitized_node_name, "process")
+            outputs.append(f"{model_name}:\n{model_outputs.get(model_name, '')}")
+
+        return "\n\n".join(outputs)
 
-        # From process to END
-        graph.add_edge("process", END)
+    def collect(self, prompt: str) -> dict[str, str]:
+        """
+        Invoke all models with a prompt and return their individual outputs.
+
+        Args:
+            prompt: The user's query
+
+        Returns:
+            Each model's output keyed by model string
+        """
+        return asyncio.run_coroutine_threadsafe(self._acollect(prompt), _get_event_loop()).result()
 
-        # Compile and return
-        return graph.compile()
+    async def ainvoke(self, prompt: str) -> str:
+        """
+        Run all agents concurrently on a single event loop.
+
+        Args:
+            prompt: The user's query
+
+        Returns:
+            Aggregated responses from all models
+        """
+        return await _on_shared_loop(self._ainvoke(prompt))
 
     def invoke(self, prompt: str) -> str:
         """
-        Invoke the graph with a prompt.
+        Invoke all models with a prompt.
 
         Args:
             prompt: The user's query
@@ -143,8 +358,4 @@ class RunLLM:
         Returns:
             Aggregated responses from all models
         """
-        # Thanks to input/output schema configuration,
-        # we can pass just the prompt string
-        result = self._graph.invoke({"prompt": prompt})
-        # Result dict contains only the output state fields
-        return result["result"]
+        return asyncio.run_coroutine_threadsafe(self._ainvoke(prompt), _get_event_loop()).result()
@@ -1,3 +0,0 @@
-from .schemas import InputState, OutputState, RunLLMState
-
-__all__ = ["InputState", "OutputState", "RunLLMState"]
@@ -1,4 +1,4 @@
-from .utils import add, subtract, multiply, divide
+from .utils import add, subtract, multiply, divide, calc
 from .tavily_tool import search_the_web
 
-__all__ = ["add", "subtract", "multiply", "divide", "search_the_web"]
+__all__ = ["add", "subtract", "multiply", "divide", "calc", "search_the_web"]
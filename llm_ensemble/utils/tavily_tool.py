@@ -1,7 +1,61 @@
 import os
+import threading
+from concurrent.futures import Future
 from langchain_core.tools import tool
 from tavily import TavilyClient
 
+# Shared Tavily client, so every search reuses the same HTTP connection pool
+_tavily: TavilyClient | None = None
+_tavily_lock = threading.Lock()
+
+# Searches currently running, keyed by normalized query
+_in_flight: dict[str, Future] = {}
+
+
+def _get_tavily_client() -> TavilyClient:
+    """Return the shared Tavily client, creating it on first use."""
+    global _tavily
+    # Lazy initialization to ensure env vars are loaded
+    with _tavily_lock:
+        if _tavily is None:
+            _tavily = TavilyClient(api_key=os.getenv("TAVILY_API_KEY"))
+        return _tavily
+
+
+def _search(query: str) -> dict:
+    """
+    Run a Tavily search, sharing the request with identical searches already in flight.
+
+    Models in an ensemble often issue the same search at the same time; only the
+    first one goes over the network and the others wait for its result.
+    """
+    key = " ".join(query.lower().split())
+    with _tavily_lock:
+        future = _in_flight.get(key)
+        owner = future is None
+        if owner:
+            future = _in_flight[key] = Future()
+
+    if not owner:
+        return future.result()
+
+    try:
+        response = _get_tavily_client().search(
+            query=query,
+            max_results=10,
+            search_depth="basic"
+        )
+    except BaseException as e:
+        # Waiters must not block forever if the search fails
+        future.set_exception(e)
+        raise
+    else:
+        future.set_result(response)
+        return response
+    finally:
+        with _tavily_lock:
+            del _in_flight[key]
+
 
 @tool
 def search_the_web(query: str):
@@ -9,22 +63,12 @@ def search_the_web(query: str):
     Search the internet for current events, news, and real-time information.
     Use this for any questions about the world that require up-to-date data.
     """
-    # Initialize Tavily Client (lazy initialization to ensure env vars are loaded)
-    tavily = TavilyClient(api_key=os.getenv("TAVILY_API_KEY"))
-
     # Execute the search using the raw SDK
-    response = tavily.search(
-        query=query,
-        max_results=10,
-        search_depth="basic"
-    )
+    response = _search(query)
 
     # Format the results into a clean string for the LLM
     # This prevents the LLM from getting confused by raw JSON metadata
-    formatted_results = []
-    for res in response['results']:
-        formatted_results.append(
-            f"Title: {res['title']}\nURL: {res['url']}\nContent: {res['content']}\n"
-        )
-
-    return "\n---\n".join(formatted_results)
+    return "\n---\n".join(
+        f"Title: {res['title']}\nURL: {res['url']}\nContent: {res['content']}\n"
+        for res in response['results']
+    )
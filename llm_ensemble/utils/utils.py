@@ -1,27 +1,81 @@
-from langchain_core.tools import tool
+import ast
+import operator
 
+from langchain_core.tools import StructuredTool, ToolException, tool
+from pydantic import BaseModel
 
-@tool
-def add(a: float, b: float) -> float:
-    """Add two numbers together."""
-    return a + b
 
+class TwoNumbers(BaseModel):
+    """Arguments shared by the arithmetic tools."""
+    a: float
+    b: float
 
-@tool
-def subtract(a: float, b: float) -> float:
-    """Subtract b from a."""
-    return a - b
+
+def _divide(a: float, b: float) -> float:
+    """Divide a by b, rejecting division by zero."""
+    if b == 0:
+        raise ValueError("Cannot divide by zero")
+    return a / b
 
 
-@tool
-def multiply(a: float, b: float) -> float:
-    """Multiply two numbers together."""
-    return a * b
+# Built from one shared args schema instead of inferring a schema per function
+add = StructuredTool.from_function(
+    func=lambda a, b: a + b, name="add", description="Add two numbers together.", args_schema=TwoNumbers
+)
+subtract = StructuredTool.from_function(
+    func=lambda a, b: a - b, name="subtract", description="Subtract b from a.", args_schema=TwoNumbers
+)
+multiply = StructuredTool.from_function(
+    func=lambda a, b: a * b, name="multiply", description="Multiply two numbers together.", args_schema=TwoNumbers
+)
+divide = StructuredTool.from_function(
+    func=_divide, name="divide", description="Divide a by b.", args_schema=TwoNumbers
+)
+
+
+# Operators allowed in calc expressions; anything else is rejected
+_BINARY_OPERATORS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+}
+_UNARY_OPERATORS = {
+    ast.UAdd: operator.pos,
+    ast.USub: operator.neg,
+}
+
+
+def _evaluate(node: ast.AST) -> float:
+    """Recursively evaluate a whitelisted arithmetic expression node."""
+    if isinstance(node, ast.Expression):
+        return _evaluate(node.body)
+    if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+        return node.value
+    if isinstance(node, ast.BinOp) and type(node.op) in _BINARY_OPERATORS:
+        left, right = _evaluate(node.left), _evaluate(node.right)
+        if isinstance(node.op, ast.Div) and right == 0:
+            raise ValueError("Cannot divide by zero")
+        return _BINARY_OPERATORS[type(node.op)](left, right)
+    if isinstance(node, ast.UnaryOp) and type(node.op) in _UNARY_OPERATORS:
+        return _UNARY_OPERATORS[type(node.op)](_evaluate(node.operand))
+    raise ValueError(f"Unsupported expression element: {ast.unparse(node)!r}")
 
 
 @tool
-def divide(a: float, b: float) -> float:
-    """Divide a by b."""
-    if b == 0:
-        raise ValueError("Cannot divide by zero")
-    return a / b
+def calc(expr: str) -> float:
+    """
+    Evaluate an arithmetic expression in a single call.
+    Supports numbers, parentheses, unary +/- and the operators +, -, *, /,
+    e.g. "(3 + 4) * 5 / 2".
+    """
+    try:
+        return float(_evaluate(ast.parse(expr, mode="eval")))
+    except (SyntaxError, ValueError, RecursionError, OverflowError, MemoryError) as e:
+        # Returned to the model as the tool result, so it can fix the expression and retry.
+        # MemoryError is what the parser raises for deeply nested input
+        raise ToolException(f"Invalid expression: {e}") from e
+
+
+# Without this, ToolNode re-raises the error and ends the model's whole answer
+calc.handle_tool_error = True
@@ -0,0 +1,39 @@
+from llm_ensemble.consensus import _agreement_hint
+
+
+def test_identical_outputs_are_flagged():
+    """Test that matching outputs produce the HIGH_AGREEMENT marker."""
+    hint = _agreement_hint(["Paris is the capital.", "Paris is the capital."])
+    assert hint == "[HIGH_AGREEMENT: mean_sim=1.00 — consensus likely reached]\n\n"
+
+
+def test_threshold_boundary():
+    """Test that similarity equal to the threshold is not flagged, only above it."""
+    # "abcd" vs "abce" share 3 of 4 characters: ratio 2 * 3 / 8 = 0.75
+    assert _agreement_hint(["abcd", "abce"], threshold=0.75) == ""
+    assert _agreement_hint(["abcd", "abce"], threshold=0.74).startswith("[HIGH_AGREEMENT: mean_sim=0.75")
+
+
+def test_least_similar_pair_decides():
+    """Test that one dissenting output suppresses the marker."""
+    assert _agreement_hint(["same answer", "same answer", "something else entirely"]) == ""
+
+
+def test_error_outputs_suppress_hint():
+    """Test that a failed model never counts towards agreement."""
+    error = "Error: no response within 120.0 seconds"
+    assert _agreement_hint([error, error]) == ""
+    assert _agreement_hint(["same answer", "same answer", error]) == ""
+
+
+def test_empty_outputs_suppress_hint():
+    """Test that empty or whitespace-only answers never count as agreement."""
+    assert _agreement_hint(["", ""]) == ""
+    assert _agreement_hint(["  \n", "\n  "]) == ""
+    assert _agreement_hint(["same answer", "same answer", ""]) == ""
+
+
+def test_fewer_than_two_outputs():
+    """Test that a single or missing output is never flagged."""
+    assert _agreement_hint([]) == ""
+    assert _agreement_hint(["only answer"]) == ""
@@ -0,0 +1,157 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from llm_ensemble.cache import BatchEmbedder, ResponseCache
+
+
+class KeywordEmbeddings:
+    """Fake embeddings: queries mentioning "cat" point one way, everything else another."""
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        return [1.0, 0.0] if "cat" in text else [0.0, 1.0]
+
+
+class FailingEmbeddings:
+    """Fake embeddings whose provider is always down."""
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        raise RuntimeError("embeddings unavailable")
+
+    def embed_query(self, text: str) -> list[float]:
+        raise RuntimeError("embeddings unavailable")
+
+
+class RecordingEmbeddings(KeywordEmbeddings):
+    """Fake embeddings that record the texts of every embed_documents call."""
+
+    def __init__(self) -> None:
+        self.batches: list[list[str]] = []
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        self.batches.append(list(texts))
+        return super().embed_documents(texts)
+
+
+def make_run(calls: list[str], response: str, cacheable: bool = True):
+    """Return a run() callback that records each call."""
+    def run() -> tuple[str, bool]:
+        calls.append(response)
+        return response, cacheable
+    return run
+
+
+def test_exact_hit():
+    """Test that a repeated query is served from the cache."""
+    cache = ResponseCache()
+    calls = []
+
+    assert cache.get_or_run("q", "models", make_run(calls, "r1")) == "r1"
+    assert cache.get_or_run("q", "models", make_run(calls, "r2")) == "r1"
+    assert calls == ["r1"]
+
+
+def test_namespace_isolation():
+    """Test that a response cached for one model set is not served to another."""
+    cache = ResponseCache(embeddings=KeywordEmbeddings())
+    calls = []
+
+    cache.get_or_run("a cat", "models-a", make_run(calls, "r1"))
+    assert cache.get_or_run("a cat", "models-b", make_run(calls, "r2")) == "r2"
+    assert calls == ["r1", "r2"]
+
+
+def test_maxsize_evicts_least_recently_used():
+    """Test that eviction drops the least recently used entry, not the oldest inserted."""
+    cache = ResponseCache(maxsize=2)
+    calls = []
+
+    cache.get_or_run("q1", "m", make_run(calls, "r1"))
+    cache.get_or_run("q2", "m", make_run(calls, "r2"))
+    cache.get_or_run("q1", "m", make_run(calls, "unused"))  # q1 is now most recent
+    cache.get_or_run("q3", "m", make_run(calls, "r3"))      # evicts q2
+
+    assert cache.get_or_run("q1", "m", make_run(calls, "unused")) == "r1"
+    assert cache.get_or_run("q2", "m", make_run(calls, "r2 again")) == "r2 again"
+    assert calls == ["r1", "r2", "r3", "r2 again"]
+
+
+def test_semantic_hit_and_miss():
+    """Test that similar short queries hit and dissimilar or long queries miss."""
+    cache = ResponseCache(embeddings=KeywordEmbeddings(), similarity_threshold=0.92)
+    calls = []
+
+    cache.get_or_run("Is my cat happy?", "m", make_run(calls, "r1"))
+    assert cache.get_or_run("Is the cat happy?", "m", make_run(calls, "unused")) == "r1"
+    assert cache.get_or_run("Is my dog happy?", "m", make_run(calls, "r2")) == "r2"
+
+    # Long refinement queries are only matched exactly
+    long_query = "Is the cat happy? " + "Previous round: ... " * 40
+    assert cache.get_or_run(long_query, "m", make_run(calls, "r3")) == "r3"
+    assert calls == ["r1", "r2", "r3"]
+
+
+def test_embedder_failure_falls_back_to_exact_match():
+    """Test that a failing embeddings model disables semantic matching only."""
+    cache = ResponseCache(embeddings=FailingEmbeddings())
+    calls = []
+
+    assert cache.get_or_run("a cat", "m", make_run(calls, "r1")) == "r1"
+    assert cache.get_or_run("a cat", "m", make_run(calls, "unused")) == "r1"
+    assert cache.get_or_run("the cat", "m", make_run(calls, "r2")) == "r2"
+    assert calls == ["r1", "r2"]
+
+
+def test_uncacheable_response_is_not_stored():
+    """Test that a response flagged as uncacheable (e.g. a model error) is retried next time."""
+    cache = ResponseCache(embeddings=KeywordEmbeddings())
+    calls = []
+
+    assert cache.get_or_run("a cat", "m", make_run(calls, "Error: timeout", cacheable=False)) == "Error: timeout"
+    assert cache.get_or_run("a cat", "m", make_run(calls, "r1")) == "r1"
+    assert cache.get_or_run("a cat", "m", make_run(calls, "unused")) == "r1"
+    assert calls == ["Error: timeout", "r1"]
+
+
+def embed_from_threads(embedder: BatchEmbedder, texts: list[str]) -> list:
+    """Call embed_query for each text from its own thread, all starting together."""
+    barrier = threading.Barrier(len(texts))
+
+    def embed(text: str):
+        barrier.wait()
+        try:
+            return embedder.embed_query(text)
+        except Exception as e:
+            return e
+
+    with ThreadPoolExecutor(max_workers=len(texts)) as pool:
+        return list(pool.map(embed, texts))
+
+
+def test_batch_embedder_coalesces_concurrent_queries():
+    """Test that concurrent embed_query calls share a single embed_documents call."""
+    embeddings = RecordingEmbeddings()
+    texts = [f"cat {i}" if i % 2 else f"dog {i}" for i in range(8)]
+
+    vectors = embed_from_threads(BatchEmbedder(embeddings, window=0.2), texts)
+
+    assert len(embeddings.batches) == 1
+    assert sorted(embeddings.batches[0]) == sorted(texts)
+    # Each caller gets the vector for its own text
+    assert vectors == [embeddings.embed_query(text) for text in texts]
+
+
+def test_batch_embedder_propagates_errors_to_every_waiter():
+    """Test that a failing batch raises in every thread waiting on it."""
+    results = embed_from_threads(BatchEmbedder(FailingEmbeddings(), window=0.2), ["a", "b", "c", "d"])
+
+    assert len(results) == 4
+    for result in results:
+        assert isinstance(result, RuntimeError)
+
+    with pytest.raises(RuntimeError, match="embeddings unavailable"):
+        BatchEmbedder(FailingEmbeddings(), window=0).embed_query("a")
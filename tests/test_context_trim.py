@@ -0,0 +1,77 @@
+from langchain_core.messages import AIMessage
+from langchain_core.messages.utils import count_tokens_approximately
+
+from llm_ensemble import Consensus
+from llm_ensemble import consensus
+from tests.test_utils import ToolCallingFakeModel
+
+ROUNDS = 8
+# Each run_llms result is about 10K tokens by the approximate count (4 characters per token)
+RESULT_CHARS = 20_000
+
+
+class RecordingJudge(ToolCallingFakeModel):
+    """Fake judge that records the approximate token count of every request it receives."""
+
+    sent_tokens: list[int] = []
+
+    def _generate(self, messages, *args, **kwargs):
+        self.sent_tokens.append(count_tokens_approximately(messages))
+        return super()._generate(messages, *args, **kwargs)
+
+
+class StubRunLLM:
+    """Stand-in for RunLLM that returns a large answer from every model without any API call."""
+
+    def __init__(self, models: list[str], **kwargs) -> None:
+        self._models = models
+
+    def collect(self, prompt: str) -> dict[str, str]:
+        return {model: f"{model} on {prompt}: " + "x" * RESULT_CHARS for model in self._models}
+
+    def aggregate(self, model_outputs: dict[str, str]) -> str:
+        return "\n\n".join(f"{name}:\n{output}" for name, output in model_outputs.items())
+
+
+def run_rounds(monkeypatch, **kwargs) -> list[int]:
+    """Run a judge that calls run_llms ROUNDS times and return the tokens sent on each judge call."""
+    judge = RecordingJudge(sent_tokens=[], messages=iter([
+        *(
+            AIMessage(content="", tool_calls=[{"name": "run_llms", "args": {"query": f"round {i}"}, "id": f"call_{i}"}])
+            for i in range(ROUNDS)
+        ),
+        AIMessage(content="done")
+    ]))
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "test")
+    monkeypatch.setattr(consensus, "RunLLM", StubRunLLM)
+    monkeypatch.setattr(consensus, "get_chat_model", lambda *args: judge)
+
+    result = Consensus(
+        models=["openai:a", "openai:b"],
+        cache_size=0,
+        # Keep summarization out of the way so only trimming bounds the history
+        summarization_trigger_tokens=10_000_000,
+        trim_trigger_tokens=30_000,
+        trim_keep_tool_results=1,
+        **kwargs
+    ).invoke("question")
+
+    assert result["messages"][-1].text == "done"
+    assert len(judge.sent_tokens) == ROUNDS + 1
+    return judge.sent_tokens
+
+
+def test_trimming_keeps_judge_requests_under_trigger(monkeypatch):
+    """Test that every judge request stays under the trim trigger while the history keeps growing."""
+    sent_tokens = run_rounds(monkeypatch)
+
+    assert max(sent_tokens) < 30_000
+    # Once trimming is active, each request carries roughly one untrimmed result
+    assert max(sent_tokens[3:]) - min(sent_tokens[3:]) < 2_000
+
+
+def test_clear_at_least_stops_after_oldest_results(monkeypatch):
+    """Test that a positive clear_at_least only clears the oldest results, so requests keep growing."""
+    sent_tokens = run_rounds(monkeypatch, trim_clear_at_least_tokens=20_000)
+
+    assert sent_tokens[-1] > sent_tokens[3] + 30_000
@@ -0,0 +1,100 @@
+import asyncio
+import time
+
+from langchain_core.messages import AIMessage
+
+from llm_ensemble import RunLLM
+from llm_ensemble import run_llm
+
+MODEL = "openai:stub"
+
+
+class StubAgent:
+    """Fake agent whose n-th ainvoke call sleeps for delays[n], then returns or raises."""
+
+    def __init__(self, delays: list[float], errors: tuple[int, ...] = ()) -> None:
+        self.delays = delays
+        self.errors = errors
+        self.started: list[float] = []
+        self.cancelled: list[int] = []
+        self.loops: list[asyncio.AbstractEventLoop] = []
+
+    async def ainvoke(self, payload: dict) -> dict:
+        call = len(self.started)
+        self.started.append(time.monotonic())
+        self.loops.append(asyncio.get_running_loop())
+        try:
+            await asyncio.sleep(self.delays[call])
+        except asyncio.CancelledError:
+            self.cancelled.append(call)
+            raise
+        if call in self.errors:
+            raise RuntimeError(f"call {call} failed")
+        return {"messages": [AIMessage(content=f"answer {call}")]}
+
+
+def make_runner(monkeypatch, agent: StubAgent, **kwargs) -> RunLLM:
+    """Build a RunLLM around a stub agent, without touching any provider."""
+    monkeypatch.setattr(run_llm, "_get_agent", lambda *args: agent)
+    return RunLLM(models=[MODEL], system_message="", warm_up=False, **kwargs)
+
+
+def test_no_hedge_without_latency_estimate(monkeypatch):
+    """Test that the first call to a model is not hedged and records its latency."""
+    agent = StubAgent([0.05])
+    runner = make_runner(monkeypatch, agent)
+
+    assert asyncio.run(runner._run_one(MODEL, agent, "q")) == (MODEL, "answer 0")
+    assert len(agent.started) == 1
+    assert runner._latency[MODEL] >= 0.05
+
+
+def test_hedge_fires_after_factor_times_latency(monkeypatch):
+    """Test that a slow request is hedged after hedge_factor x latency and the loser is cancelled."""
+    agent = StubAgent([1.0, 0.01])
+    runner = make_runner(monkeypatch, agent, hedge_factor=1.5)
+    runner._latency[MODEL] = 0.1
+
+    assert asyncio.run(runner._run_one(MODEL, agent, "q")) == (MODEL, "answer 1")
+    assert len(agent.started) == 2
+    assert 0.15 <= agent.started[1] - agent.started[0] < 0.5
+    assert agent.cancelled == [0]
+
+
+def test_hedge_disabled(monkeypatch):
+    """Test that hedge=False never issues a second request."""
+    agent = StubAgent([0.2])
+    runner = make_runner(monkeypatch, agent, hedge=False)
+    runner._latency[MODEL] = 0.01
+
+    assert asyncio.run(runner._run_one(MODEL, agent, "q")) == (MODEL, "answer 0")
+    assert len(agent.started) == 1
+
+
+def test_hedge_fails_only_if_both_fail(monkeypatch):
+    """Test that a failed request still returns the other one's answer, and both failing is an error."""
+    agent = StubAgent([0.2, 0.3], errors=(0,))
+    runner = make_runner(monkeypatch, agent)
+    runner._latency[MODEL] = 0.05
+
+    assert asyncio.run(runner._run_one(MODEL, agent, "q")) == (MODEL, "answer 1")
+
+    agent = StubAgent([0.2, 0.3], errors=(0, 1))
+    runner = make_runner(monkeypatch, agent)
+    runner._latency[MODEL] = 0.05
+
+    _, output = asyncio.run(runner._run_one(MODEL, agent, "q"))
+    assert output.startswith("Error: call")
+    assert len(agent.started) == 2
+
+
+def test_timeout_returns_error_line(monkeypatch):
+    """Test that a model exceeding the timeout yields an error line and its requests are cancelled."""
+    agent = StubAgent([1.0, 1.0])
+    runner = make_runner(monkeypatch, agent, timeout=0.2)
+    runner._latency[MODEL] = 0.05
+
+    assert asyncio.run(runner._run_one(MODEL, agent, "q")) == (
+        MODEL, "Error: no response within 0.2 seconds"
+    )
+    assert sorted(agent.cancelled) == [0, 1]
@@ -0,0 +1,63 @@
+import asyncio
+import time
+from contextlib import aclosing
+
+from llm_ensemble import RunLLM
+from llm_ensemble import run_llm
+from tests.test_hedge import StubAgent
+
+FAST, SLOW = "openai:fast", "openai:slow"
+
+
+def make_runner(monkeypatch, agents: dict[str, StubAgent]) -> RunLLM:
+    """Build a RunLLM with one stub agent per model string."""
+    monkeypatch.setattr(run_llm, "_get_agent", lambda model_string, *args: agents[model_string])
+    return RunLLM(models=list(agents), system_message="", warm_up=False)
+
+
+def test_invoke_inside_running_loop(monkeypatch):
+    """Test that the sync invoke works when called from code already running an event loop."""
+    agents = {FAST: StubAgent([0.01]), SLOW: StubAgent([0.05])}
+    runner = make_runner(monkeypatch, agents)
+
+    async def main() -> str:
+        return runner.invoke("q")
+
+    assert asyncio.run(main()) == f"{FAST}:\nanswer 0\n\n{SLOW}:\nanswer 0"
+    assert agents[FAST].loops == [run_llm._get_event_loop()]
+
+
+def test_ainvoke_from_foreign_loop(monkeypatch):
+    """Test that ainvoke from another event loop runs the agents on the shared loop."""
+    agents = {FAST: StubAgent([0.01, 0.01]), SLOW: StubAgent([0.05, 0.05])}
+    runner = make_runner(monkeypatch, agents)
+
+    # Two separate asyncio.run calls, i.e. two different caller loops
+    for _ in range(2):
+        assert asyncio.run(runner.ainvoke("q")).startswith(f"{FAST}:\nanswer")
+
+    shared = run_llm._get_event_loop()
+    assert agents[FAST].loops == agents[SLOW].loops == [shared, shared]
+
+
+def test_astream_cancels_slower_models_on_early_exit(monkeypatch):
+    """Test that astream yields the fastest model first and cancels the rest when the consumer stops."""
+    agents = {SLOW: StubAgent([2.0]), FAST: StubAgent([0.01])}
+    runner = make_runner(monkeypatch, agents)
+
+    async def first() -> tuple[str, str]:
+        async with aclosing(runner.astream("q")) as stream:
+            async for item in stream:
+                break
+        # Closing the stream must cancel the slow model, not leave it to asyncio.run's cleanup;
+        # the cancellation is delivered on the shared loop
+        for _ in range(100):
+            if agents[SLOW].cancelled:
+                break
+            await asyncio.sleep(0.01)
+        assert agents[SLOW].cancelled == [0]
+        return item
+
+    start = time.monotonic()
+    assert asyncio.run(first()) == (FAST, "answer 0")
+    assert time.monotonic() - start < 1.5
@@ -0,0 +1,47 @@
+from langchain.agents import create_agent
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+
+from llm_ensemble.utils import calc
+
+
+class ToolCallingFakeModel(GenericFakeChatModel):
+    """Fake chat model that replays scripted messages and accepts bound tools."""
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+
+def test_calc_expression():
+    """Test that calc evaluates a multi-operation expression in one call."""
+    assert calc.invoke({"expr": "(3 + 4) * 5 / 2"}) == 17.5
+    assert calc.invoke({"expr": "-2.5 * -2 - +1"}) == 4.0
+
+
+def test_calc_rejects_unsafe_input():
+    """Test that calc only accepts arithmetic and reports errors instead of raising."""
+    for expr in ["__import__('os')", "2 ** 10", "10 % 3", "x + 1", "'a' * 3", "True + 1", "2 +", "(" * 200_000]:
+        assert calc.invoke({"expr": expr}).startswith("Invalid expression: ")
+
+    assert calc.invoke({"expr": "1 / (2 - 2)"}) == "Invalid expression: Cannot divide by zero"
+
+
+def test_calc_errors_reach_the_agent_model():
+    """Test that a bad expression inside an agent becomes a tool result the model can retry on."""
+    exprs = ["2**3", "10 % 3", "2 +", "2 * 2 * 2"]
+    model = ToolCallingFakeModel(messages=iter([
+        *(
+            AIMessage(content="", tool_calls=[{"name": "calc", "args": {"expr": expr}, "id": f"call_{i}"}])
+            for i, expr in enumerate(exprs)
+        ),
+        AIMessage(content="8")
+    ]))
+    agent = create_agent(model=model, tools=[calc])
+
+    result = agent.invoke({"messages": [{"role": "user", "content": "What is 2 cubed?"}]})
+
+    tool_results = [message for message in result["messages"] if message.type == "tool"]
+    assert [message.status for message in tool_results] == ["error", "error", "error", "success"]
+    assert tool_results[0].content.startswith("Invalid expression: Unsupported expression element")
+    assert tool_results[-1].content == "8.0"
+    assert result["messages"][-1].text == "8"